@@ -1,13 +1,13 @@
-from flask import Flask, jsonify
+from flask import Flask, Response
 
 app = Flask(__name__)
 
+# Ответ пробы неизменен — собираем его один раз вместо jsonify на каждый вызов
+_HEALTH_RESPONSE = b'{"status":"ok","message":"user info service"}'
+
 @app.get("/health")
 def health():
-    return jsonify({
-        "status": "ok",
-        "message": "user info service",
-    })
+    return Response(response=_HEALTH_RESPONSE, mimetype="application/json")
 
 
 if __name__ == "__main__":
@@ -2,76 +2,106 @@
 Сервис аутентификации: регистрация, вход, обновление токенов.
 JWT: access token (15 мин) + refresh token (30 дней).
 """
+import asyncio
+import hashlib
+import time
 from datetime import datetime, timezone, timedelta
 
 import bcrypt
-import jwt
-from sqlalchemy import select
+from sqlalchemy import bindparam, insert, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app import fast_jwt
 from app.config import settings
 from app.exceptions import (
     RefreshTokenInvalidError, TokenInvalidError, UsernameConflictError,
 )
 from app.models.orm import User, RefreshToken, UserRole
 
+# Statement собран один раз на модуль — компиляционный кэш SQLAlchemy
+# гарантированно попадает по тому же объекту на каждом запросе
+_USER_BY_USERNAME = select(User).where(User.username == bindparam("username"))
+
+# Время жизни токенов в секундах — посчитано один раз при старте
+_ACCESS_EXPIRE_SECONDS = settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+_REFRESH_EXPIRE_SECONDS = settings.REFRESH_TOKEN_EXPIRE_DAYS * 24 * 3600
+
+# Ключ подписи в bytes — чтобы не кодировать str на каждый encode/decode
+_SECRET_BYTES = settings.SECRET_KEY.encode()
+
 
 def hash_password(password: str) -> str:
-    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+    salt = bcrypt.gensalt(rounds=settings.BCRYPT_ROUNDS)
+    return bcrypt.hashpw(password.encode("utf-8"), salt).decode("utf-8")
 
 
 def verify_password(plain: str, hashed: str) -> bool:
     return bcrypt.checkpw(plain.encode("utf-8"), hashed.encode("utf-8"))
 
 
-def _create_token(user_id: int, role: str, token_type: str, expires_delta: timedelta) -> str:
-    now = datetime.now(timezone.utc)
+# bcrypt — это ~100мс чистого CPU на вызов: выполняем его в thread pool,
+# чтобы не блокировать event loop на время хеширования.
+async def ahash_password(password: str) -> str:
+    return await asyncio.get_running_loop().run_in_executor(None, hash_password, password)
+
+
+async def averify_password(plain: str, hashed: str) -> bool:
+    return await asyncio.get_running_loop().run_in_executor(None, verify_password, plain, hashed)
+
+
+def _hash_token(token: str) -> bytes:
+    """sha256 от refresh-токена — в таком виде он хранится в БД."""
+    return hashlib.sha256(token.encode("ascii")).digest()
+
+
+def _create_token(user_id: int, role: str, token_type: str, expires_in: int) -> str:
+    # Целочисленные epoch-клеймы: без datetime-объектов на пути выпуска токена
+    now_ts = int(time.time())
     payload = {
         "sub": str(user_id),
         "role": role,
         "type": token_type,
-        "iat": now,
-        "exp": now + expires_delta,
+        "iat": now_ts,
+        "exp": now_ts + expires_in,
     }
-    return jwt.encode(payload, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+    return fast_jwt.encode(payload, _SECRET_BYTES)
 
 
 async def register_user(username: str, password: str, role: UserRole, db: AsyncSession) -> User:
-    existing = await db.execute(select(User).where(User.username == username))
+    existing = await db.execute(_USER_BY_USERNAME, {"username": username})
     if existing.scalar_one_or_none():
         raise UsernameConflictError()
 
     user = User(
         username=username,
-        password_hash=hash_password(password),
+        password_hash=await ahash_password(password),
         role=role,
     )
     db.add(user)
     await db.commit()
-    await db.refresh(user)
     return user
 
 
 async def login_user(username: str, password: str, db: AsyncSession) -> tuple[str, str]:
-    result = await db.execute(select(User).where(User.username == username))
+    result = await db.execute(_USER_BY_USERNAME, {"username": username})
     user = result.scalar_one_or_none()
 
-    if not user or not verify_password(password, user.password_hash):
+    if not user or not await averify_password(password, user.password_hash):
         raise TokenInvalidError()
 
-    access_token = _create_token(
-        user.id, user.role.value, "access",
-        timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES),
-    )
-    refresh_token_str = _create_token(
-        user.id, user.role.value, "refresh",
-        timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS),
-    )
+    access_token = _create_token(user.id, user.role.value, "access", _ACCESS_EXPIRE_SECONDS)
+    refresh_token_str = _create_token(user.id, user.role.value, "refresh", _REFRESH_EXPIRE_SECONDS)
 
-    # Сохраняем refresh token в БД для возможности инвалидации
+    # Сохраняем refresh token в БД для возможности инвалидации.
+    # Core-insert вместо db.add: без unit-of-work бухгалтерии и autoflush
     expires_at = datetime.now(timezone.utc) + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
-    rt = RefreshToken(user_id=user.id, token=refresh_token_str, expires_at=expires_at)
-    db.add(rt)
+    await db.execute(
+        insert(RefreshToken).values(
+            user_id=user.id,
+            token_hash=_hash_token(refresh_token_str),
+            expires_at=expires_at,
+        )
+    )
     await db.commit()
 
     return access_token, refresh_token_str
@@ -80,43 +110,30 @@ async def login_user(username: str, password: str, db: AsyncSession) -> tuple[st
 async def refresh_access_token(refresh_token_str: str, db: AsyncSession) -> tuple[str, str]:
     # Проверяем подпись и срок
     try:
-        payload = jwt.decode(
-            refresh_token_str, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
-        )
-    except jwt.ExpiredSignatureError:
-        raise RefreshTokenInvalidError()
-    except jwt.PyJWTError:
+        payload = fast_jwt.decode(refresh_token_str, _SECRET_BYTES)
+    except fast_jwt.InvalidTokenError:
         raise RefreshTokenInvalidError()
 
     if payload.get("type") != "refresh":
         raise RefreshTokenInvalidError()
 
-    # Проверяем наличие в БД (не был ли отозван)
-    result = await db.execute(
-        select(RefreshToken).where(RefreshToken.token == refresh_token_str)
-    )
-    rt = result.scalar_one_or_none()
-    if rt is None:
-        raise RefreshTokenInvalidError()
-
     user_id = int(payload["sub"])
     role = payload["role"]
 
-    # Ротируем refresh token: удаляем старый, создаём новый
-    await db.delete(rt)
-
-    new_access = _create_token(
-        user_id, role, "access",
-        timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES),
-    )
-    new_refresh = _create_token(
-        user_id, role, "refresh",
-        timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS),
-    )
+    new_access = _create_token(user_id, role, "access", _ACCESS_EXPIRE_SECONDS)
+    new_refresh = _create_token(user_id, role, "refresh", _REFRESH_EXPIRE_SECONDS)
 
+    # Ротация одним statement: проверка «не отозван» (WHERE) и замена
+    # старого токена новым (SET) — без DELETE + INSERT
     expires_at = datetime.now(timezone.utc) + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
-    new_rt = RefreshToken(user_id=user_id, token=new_refresh, expires_at=expires_at)
-    db.add(new_rt)
+    result = await db.execute(
+        update(RefreshToken)
+        .where(RefreshToken.token_hash == _hash_token(refresh_token_str))
+        .values(token_hash=_hash_token(new_refresh), expires_at=expires_at)
+        .returning(RefreshToken.id)
+    )
+    if result.first() is None:
+        raise RefreshTokenInvalidError()
     await db.commit()
 
     return new_access, new_refresh
@@ -3,7 +3,22 @@ from sqlalchemy.orm import DeclarativeBase
 
 from app.config import settings
 
-engine = create_async_engine(settings.DATABASE_URL, echo=False)
+# Пул и кэш prepared statements настроены под конкурентную нагрузку FastAPI:
+# дефолтный pool_size=5 сериализует запросы, а без кэша asyncpg заново
+# готовит каждый statement. jit=off убирает прогрев PG JIT на коротких OLTP-запросах.
+engine = create_async_engine(
+    settings.DATABASE_URL,
+    echo=False,
+    pool_size=20,
+    max_overflow=10,
+    pool_pre_ping=True,
+    pool_recycle=1800,
+    connect_args={
+        "prepared_statement_cache_size": 256,
+        "statement_cache_size": 256,
+        "server_settings": {"jit": "off"},
+    },
+)
 
 AsyncSessionLocal = async_sessionmaker(
     bind=engine,
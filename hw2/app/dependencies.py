@@ -1,19 +1,37 @@
 """
 FastAPI-зависимости: получение текущего пользователя из JWT, проверка ролей.
 """
+import time
+from functools import lru_cache
+
 from fastapi import Depends, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
 
+from app import fast_jwt
+from app.config import settings
 from app.database import get_db
 from app.exceptions import TokenExpiredError, TokenInvalidError, AccessDeniedError
 from app.models.orm import User, UserRole
-import jwt
-from app.config import settings
 
 bearer_scheme = HTTPBearer(auto_error=False)
 
+# Ключ подписи в bytes — чтобы не кодировать str на каждую проверку токена
+_SECRET_BYTES = settings.SECRET_KEY.encode()
+
+
+@lru_cache(maxsize=4096)
+def _decode_token(token: str) -> dict:
+    """
+    Проверяет подпись и декодирует токен с кэшированием по строке токена.
+
+    Один и тот же access token предъявляется сотнями запросов за 15 минут
+    жизни — пересчитывать HMAC-SHA256 каждый раз незачем. Срок действия
+    здесь НЕ проверяется (он зависит от времени вызова) — exp проверяет
+    вызывающая сторона на каждом запросе.
+    """
+    return fast_jwt.decode(token, _SECRET_BYTES, verify_exp=False)
+
 
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme),
@@ -24,12 +42,13 @@ async def get_current_user(
 
     token = credentials.credentials
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-    except jwt.ExpiredSignatureError:
-        raise TokenExpiredError()
-    except jwt.PyJWTError:
+        payload = _decode_token(token)
+    except fast_jwt.InvalidTokenError:
         raise TokenInvalidError()
 
+    if payload.get("exp", 0) <= time.time():
+        raise TokenExpiredError()
+
     token_type = payload.get("type")
     if token_type != "access":
         raise TokenInvalidError()
@@ -38,8 +57,8 @@ async def get_current_user(
     if user_id is None:
         raise TokenInvalidError()
 
-    result = await db.execute(select(User).where(User.id == int(user_id)))
-    user = result.scalar_one_or_none()
+    # db.get: поиск по PK через identity map, без сборки/компиляции Select
+    user = await db.get(User, int(user_id))
     if user is None:
         raise TokenInvalidError()
 
@@ -0,0 +1,76 @@
+"""
+Минимальный кодек JWT HS256 вместо PyJWT.
+
+PyJWT на каждый encode/decode проходит путь json.dumps → base64url →
+резолв класса алгоритма → hmac, с кучей промежуточных bytes-аллокаций.
+Здесь тот же формат токена собирается напрямую: orjson + hashlib.sha256
+(OpenSSL, использует SHA-NI на современных CPU) + константный header.
+
+Поддерживается только HS256 — единственный алгоритм, который использует
+сервис. Сигнатуры исключений повторяют семантику PyJWT.
+"""
+import base64
+import binascii
+import hashlib
+import hmac
+import time
+
+import orjson
+
+
+class InvalidTokenError(Exception):
+    """Токен малформирован или подпись не сходится."""
+
+
+class ExpiredSignatureError(InvalidTokenError):
+    """Срок действия токена (exp) истёк."""
+
+
+# base64url({"alg":"HS256","typ":"JWT"}) — константа для всех наших токенов
+_HEADER_B64 = base64.urlsafe_b64encode(
+    orjson.dumps({"alg": "HS256", "typ": "JWT"})
+).rstrip(b"=")
+
+
+def _b64url_decode(segment: bytes) -> bytes:
+    return base64.urlsafe_b64decode(segment + b"=" * (-len(segment) % 4))
+
+
+def encode(payload: dict, key: bytes) -> str:
+    payload_b64 = base64.urlsafe_b64encode(orjson.dumps(payload)).rstrip(b"=")
+    signing_input = _HEADER_B64 + b"." + payload_b64
+    sig = base64.urlsafe_b64encode(
+        hmac.new(key, signing_input, hashlib.sha256).digest()
+    ).rstrip(b"=")
+    return (signing_input + b"." + sig).decode("ascii")
+
+
+def decode(
+    token: str,
+    key: bytes | None = None,
+    *,
+    verify_signature: bool = True,
+    verify_exp: bool = True,
+) -> dict:
+    try:
+        signing_input, _, sig_b64 = token.encode("ascii").rpartition(b".")
+        _, _, payload_b64 = signing_input.partition(b".")
+        if verify_signature:
+            expected = hmac.new(key, signing_input, hashlib.sha256).digest()
+            if not hmac.compare_digest(_b64url_decode(sig_b64), expected):
+                raise InvalidTokenError("Подпись не совпадает")
+        payload = orjson.loads(_b64url_decode(payload_b64))
+    except InvalidTokenError:
+        raise
+    except (ValueError, binascii.Error, UnicodeError):
+        raise InvalidTokenError("Малформированный токен")
+
+    if not isinstance(payload, dict):
+        raise InvalidTokenError("Payload не является объектом")
+
+    if verify_exp:
+        exp = payload.get("exp")
+        if exp is not None and exp <= time.time():
+            raise ExpiredSignatureError("Токен истёк")
+
+    return payload
@@ -2,14 +2,16 @@
 Точка входа FastAPI-приложения.
 Регистрирует роутеры, middleware, обработчики ошибок.
 """
-import json
 import logging
+import queue
 import sys
+from contextlib import asynccontextmanager
+from logging.handlers import QueueHandler, QueueListener
 
-from fastapi import FastAPI, Request
+import orjson
+from fastapi import FastAPI, Request, Response
 from fastapi.exceptions import RequestValidationError
-from fastapi.responses import JSONResponse
-from pythonjsonlogger import jsonlogger
+from fastapi.responses import ORJSONResponse
 
 from app.exceptions import AppError
 from app.middleware.logging import RequestLoggingMiddleware
@@ -20,20 +22,37 @@ from app.promo_codes.router import router as promo_codes_router
 
 # ── Настройка JSON-логирования ────────────────────────────────────────────────
 
-class CustomJsonFormatter(jsonlogger.JsonFormatter):
-    """Объединяет стандартные поля logRecord с нашими json_fields из middleware."""
-    def add_fields(self, log_record, record, message_dict):
-        super().add_fields(log_record, record, message_dict)
+class OrjsonFormatter(logging.Formatter):
+    """
+    Сериализует запись в JSON через orjson (в разы быстрее stdlib json).
+    Объединяет стандартные поля logRecord с нашими json_fields из middleware.
+    """
+    def format(self, record):
+        log_record = {"message": record.getMessage()}
         if hasattr(record, "json_fields"):
             log_record.update(record.json_fields)
+        return orjson.dumps(log_record, default=str).decode("utf-8")
+
+
+# Сериализация и запись в stdout вынесены в отдельный поток: middleware лишь
+# кладёт запись в очередь (O(1)) и не ждёт orjson.dumps + write под GIL.
+_log_queue: queue.SimpleQueue = queue.SimpleQueue()
 
+_stream_handler = logging.StreamHandler(sys.stdout)
+_stream_handler.setFormatter(OrjsonFormatter())
+_log_listener = QueueListener(_log_queue, _stream_handler)
 
-handler = logging.StreamHandler(sys.stdout)
-handler.setFormatter(CustomJsonFormatter())
-logging.getLogger("api").addHandler(handler)
+logging.getLogger("api").addHandler(QueueHandler(_log_queue))
 logging.getLogger("api").setLevel(logging.INFO)
 logging.getLogger("api").propagate = False
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    _log_listener.start()
+    yield
+    _log_listener.stop()
+
 # ── Приложение ────────────────────────────────────────────────────────────────
 
 app = FastAPI(
@@ -43,6 +62,8 @@ app = FastAPI(
     docs_url="/docs",
     redoc_url="/redoc",
     openapi_url="/openapi.json",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan,
 )
 
 app.add_middleware(RequestLoggingMiddleware)
@@ -52,7 +73,7 @@ app.add_middleware(RequestLoggingMiddleware)
 @app.exception_handler(AppError)
 async def app_error_handler(request: Request, exc: AppError):
     """Единый формат ответа для всех бизнес-ошибок."""
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=exc.http_status,
         content={
             "error_code": exc.error_code,
@@ -75,7 +96,7 @@ async def validation_error_handler(request: Request, exc: RequestValidationError
             "message": error["msg"],
             "type": error["type"],
         })
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=400,
         content={
             "error_code": "VALIDATION_ERROR",
@@ -93,6 +114,10 @@ app.include_router(orders_router)
 app.include_router(promo_codes_router)
 
 
+# Тело ответа liveness-пробы неизменно — байты закодированы один раз
+_HEALTH_BODY = b'{"status":"ok"}'
+
+
 @app.get("/health", tags=["system"])
 async def health():
-    return {"status": "ok"}
+    return Response(content=_HEALTH_BODY, media_type="application/json")
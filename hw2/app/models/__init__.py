@@ -1,11 +1,13 @@
 from app.models.orm import (
     User, RefreshToken, Product, PromoCode, Order, OrderItem, UserOperation,
     UserRole, ProductStatus, OrderStatus, DiscountType, OperationType,
-    ORDER_STATE_TRANSITIONS,
+    ORDER_STATE_TRANSITIONS, can_transition,
+    coerce_product_status, coerce_discount_type,
 )
 
 __all__ = [
     "User", "RefreshToken", "Product", "PromoCode", "Order", "OrderItem", "UserOperation",
     "UserRole", "ProductStatus", "OrderStatus", "DiscountType", "OperationType",
-    "ORDER_STATE_TRANSITIONS",
+    "ORDER_STATE_TRANSITIONS", "can_transition",
+    "coerce_product_status", "coerce_discount_type",
 ]
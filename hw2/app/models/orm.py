@@ -5,10 +5,11 @@ SQLAlchemy ORM-модели — отражают схему базы данны
 import enum
 from datetime import datetime
 from decimal import Decimal
+from functools import lru_cache
 
 from sqlalchemy import (
     BigInteger, Boolean, Column, DateTime, Enum, ForeignKey,
-    Integer, Numeric, String, Text, func,
+    Integer, LargeBinary, Numeric, String, Text, func,
 )
 from sqlalchemy.orm import relationship
 
@@ -56,9 +57,36 @@ ORDER_STATE_TRANSITIONS: dict[OrderStatus, set[OrderStatus]] = {
     OrderStatus.CANCELED: set(),
 }
 
+# Та же таблица по строковым значениям: интернированные str хешируются
+# дешевле enum-членов, frozenset не мутируется случайно
+_TRANSITIONS_BY_VALUE: dict[str, frozenset[str]] = {
+    k.value: frozenset(v.value for v in targets)
+    for k, targets in ORDER_STATE_TRANSITIONS.items()
+}
+
+
+def can_transition(current: str, target: str) -> bool:
+    """Допустим ли переход заказа из состояния current в target."""
+    return target in _TRANSITIONS_BY_VALUE[current]
+
+
+# Приведение значения из Pydantic-enum/строки к ORM-enum без hasattr-ветки
+# на каждом запросе; домен значений крошечный, lru_cache сводит вызов
+# к одному dict-lookup
+@lru_cache(maxsize=None)
+def coerce_product_status(raw) -> "ProductStatus":
+    return ProductStatus(raw.value if isinstance(raw, enum.Enum) else raw)
+
+
+@lru_cache(maxsize=None)
+def coerce_discount_type(raw) -> "DiscountType":
+    return DiscountType(raw.value if isinstance(raw, enum.Enum) else raw)
+
 
 class User(Base):
     __tablename__ = "users"
+    # created_at приходит через RETURNING при flush — без refresh после коммита
+    __mapper_args__ = {"eager_defaults": True}
 
     id = Column(BigInteger, primary_key=True, autoincrement=True)
     username = Column(String(50), unique=True, nullable=False, index=True)
@@ -77,7 +105,9 @@ class RefreshToken(Base):
 
     id = Column(BigInteger, primary_key=True, autoincrement=True)
     user_id = Column(BigInteger, ForeignKey("users.id"), nullable=False)
-    token = Column(String(512), unique=True, nullable=False)
+    # Храним только sha256 от токена: индекс по 32 байтам вместо 512-символьной
+    # строки, и сами токены не утекают при компрометации БД
+    token_hash = Column(LargeBinary(32), unique=True, nullable=False, index=True)
     expires_at = Column(DateTime(timezone=True), nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
 
@@ -86,6 +116,8 @@ class RefreshToken(Base):
 
 class Product(Base):
     __tablename__ = "products"
+    # created_at/updated_at приходят через RETURNING при flush
+    __mapper_args__ = {"eager_defaults": True}
 
     id = Column(BigInteger, primary_key=True, autoincrement=True)
     name = Column(String(255), nullable=False)
@@ -121,11 +153,17 @@ class PromoCode(Base):
 
 class Order(Base):
     __tablename__ = "orders"
+    # Сервергенерируемые значения (created_at, updated_at из триггера)
+    # забираются через RETURNING при flush — без refresh после коммита
+    __mapper_args__ = {"eager_defaults": True}
 
     id = Column(BigInteger, primary_key=True, autoincrement=True)
     user_id = Column(BigInteger, ForeignKey("users.id"), nullable=False)
     status = Column(Enum(OrderStatus), nullable=False, default=OrderStatus.CREATED)
     promo_code_id = Column(BigInteger, ForeignKey("promo_codes.id"), nullable=True)
+    # Снапшот кода на момент применения (аналогично price_at_order):
+    # код доступен без SELECT по promo_code_id
+    promo_code_snapshot = Column(String(20), nullable=True)
     total_amount = Column(Numeric(12, 2), nullable=False, default=0)
     discount_amount = Column(Numeric(12, 2), nullable=False, default=0)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
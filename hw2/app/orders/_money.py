@@ -0,0 +1,29 @@
+"""
+Целочисленная арифметика денег (в центах/копейках).
+
+Decimal под CPython аллоцирует объект на каждую операцию и на порядок
+медленнее нативного int. Все колонки денег — Numeric(12, 2), то есть суммы
+точно представимы целым числом центов; Decimal остаётся только на границе
+БД/API, вся арифметика горячего пути — int.
+"""
+from decimal import Decimal
+
+_CENT = Decimal("0.01")
+
+
+def to_cents(amount: Decimal) -> int:
+    """Numeric(12,2) из БД → целые центы."""
+    return int(amount * 100)
+
+
+def from_cents(cents: int) -> Decimal:
+    """Целые центы → Decimal для колонок Numeric(12,2)."""
+    return cents * _CENT
+
+
+def pct_of(cents: int, pct_cents: int) -> int:
+    """
+    Процент от суммы; pct_cents — процент в сотых долях (10.50% == 1050).
+    Округление half-up, как у прежнего Decimal.quantize.
+    """
+    return (cents * pct_cents + 5000) // 10000
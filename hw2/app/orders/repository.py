@@ -1,27 +1,30 @@
 from typing import Optional
 
-from sqlalchemy import select
+from sqlalchemy import bindparam, select
 from sqlalchemy.orm import selectinload
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.orm import Order, OrderItem, OrderStatus
 
+# Statements собираются один раз при импорте — per-request остаётся только
+# подстановка параметров
+_ORDER_BY_ID = (
+    select(Order)
+    .where(Order.id == bindparam("oid"))
+    .options(selectinload(Order.items))
+)
+_ACTIVE_ORDER_FOR_USER = select(Order).where(
+    Order.user_id == bindparam("uid"),
+    Order.status.in_([OrderStatus.CREATED, OrderStatus.PAYMENT_PENDING]),
+)
+
 
 async def get_by_id(db: AsyncSession, order_id: int) -> Optional[Order]:
-    result = await db.execute(
-        select(Order)
-        .where(Order.id == order_id)
-        .options(selectinload(Order.items))
-    )
+    result = await db.execute(_ORDER_BY_ID, {"oid": order_id})
     return result.scalar_one_or_none()
 
 
 async def get_active_order_for_user(db: AsyncSession, user_id: int) -> Optional[Order]:
     """Возвращает активный заказ пользователя (CREATED или PAYMENT_PENDING)."""
-    result = await db.execute(
-        select(Order).where(
-            Order.user_id == user_id,
-            Order.status.in_([OrderStatus.CREATED, OrderStatus.PAYMENT_PENDING]),
-        )
-    )
+    result = await db.execute(_ACTIVE_ORDER_FOR_USER, {"uid": user_id})
     return result.scalar_one_or_none()
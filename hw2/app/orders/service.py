@@ -1,7 +1,7 @@
 """
 Бизнес-логика заказов.
 Реализует все проверки и инварианты, описанные в задании:
-  - rate limiting через user_operations
+  - rate limiting через Redis (user_operations остаётся как аудит)
   - проверка активных заказов
   - проверка статуса и остатков товаров
   - резервирование stock в транзакции
@@ -9,27 +9,74 @@
   - промокоды (PERCENTAGE / FIXED_AMOUNT, max 70% скидка)
   - конечный автомат состояний заказа
 """
-from datetime import datetime, timezone, timedelta
-from decimal import Decimal, ROUND_HALF_UP
+import asyncio
+import time
+from datetime import datetime, timezone
+from decimal import Decimal
 from typing import Optional
 
-from sqlalchemy import select
-from sqlalchemy.orm import selectinload
+from sqlalchemy import bindparam, delete, insert, select, text, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config import settings
+from app.redis_client import redis
 from app.exceptions import (
-    OrderNotFoundError, OrderLimitExceededError, OrderHasActiveError,
+    OrderNotFoundError, OrderHasActiveError, OrderOwnershipViolationError,
+    OrderLimitExceededError,
     ProductNotFoundError, ProductInactiveError, InsufficientStockError,
     PromoCodeInvalidError, PromoCodeMinAmountError,
-    InvalidStateTransitionError, OrderOwnershipViolationError, AccessDeniedError,
+    InvalidStateTransitionError, AccessDeniedError,
 )
 from app.models.orm import (
     Order, OrderItem, OrderStatus, Product, ProductStatus,
     PromoCode, DiscountType, UserOperation, OperationType,
-    UserRole, User, ORDER_STATE_TRANSITIONS,
+    UserRole, User, can_transition,
 )
 from app.orders import repository
+from app.orders._money import from_cents, pct_of, to_cents
+from app.promo_codes import cache as promo_cache
+
+# Statements собираются один раз при импорте — per-request остаётся только
+# подстановка параметров
+_PROMO_BY_ID = select(PromoCode).where(PromoCode.id == bindparam("pid"))
+# Проверка и инкремент использования промокода в одном атомарном UPDATE:
+# все условия валидности в WHERE, нет окна lost update между конкурентными
+# заказами. 0 строк в RETURNING == промокод неприменим.
+_PROMO_CLAIM = (
+    update(PromoCode)
+    .where(
+        PromoCode.code == bindparam("code"),
+        PromoCode.active,
+        PromoCode.current_uses < PromoCode.max_uses,
+        PromoCode.valid_from <= bindparam("now"),
+        PromoCode.valid_until >= bindparam("now"),
+    )
+    .values(current_uses=PromoCode.current_uses + 1)
+    .returning(
+        PromoCode.id,
+        PromoCode.discount_type,
+        PromoCode.discount_value,
+        PromoCode.min_order_amount,
+    )
+)
+# Возврат использования (отмена/пересчёт заказа) — тоже условный UPDATE
+_PROMO_RELEASE = (
+    update(PromoCode)
+    .where(PromoCode.id == bindparam("pid"), PromoCode.current_uses > 0)
+    .values(current_uses=PromoCode.current_uses - 1)
+)
+# Относительный возврат остатков: executemany одним round trip'ом,
+# без SELECT и без перезаписи конкурентных списаний абсолютным значением
+_STOCK_RESTORE = (
+    update(Product)
+    .where(Product.id == bindparam("pid"))
+    .values(stock=Product.stock + bindparam("qty"))
+)
+
+# Транзакционный advisory lock по user_id: сериализует операции одного
+# пользователя над его заказами (закрывает гонку "два конкурентных заказа"),
+# снимается автоматически на commit/rollback, строк не блокирует
+_USER_LOCK = text("SELECT pg_advisory_xact_lock(:k)")
 
 
 def _check_order_access(order: Order, user: User) -> None:
@@ -40,46 +87,84 @@ def _check_order_access(order: Order, user: User) -> None:
         raise OrderOwnershipViolationError()
 
 
-async def _check_rate_limit(db: AsyncSession, user_id: int, op_type: OperationType) -> None:
-    """Проверяет, что с момента последней операции прошло >= N минут."""
-    cutoff = datetime.now(timezone.utc) - timedelta(minutes=settings.ORDER_RATE_LIMIT_MINUTES)
-    result = await db.execute(
-        select(UserOperation)
-        .where(
-            UserOperation.user_id == user_id,
-            UserOperation.operation_type == op_type,
-            UserOperation.created_at > cutoff,
-        )
-        .order_by(UserOperation.created_at.desc())
-        .limit(1)
-    )
-    if result.scalar_one_or_none():
+def _rate_limit_key(user_id: int, op_type: OperationType) -> str:
+    return f"rl:{op_type.value}:{user_id}"
+
+
+async def _check_rate_limit(user_id: int, op_type: OperationType) -> None:
+    """
+    Проверяет, что с момента последней операции прошло >= N минут.
+
+    Скользящее окно в Redis sorted set (score = unix-мс): чистка устаревших
+    меток + подсчёт за субмиллисекунду, без round trip в Postgres. Метку
+    ставит _record_operation после успешного коммита — неудавшиеся запросы
+    лимит не расходуют.
+    """
+    key = _rate_limit_key(user_id, op_type)
+    now_ms = int(time.time() * 1000)
+    window_ms = settings.ORDER_RATE_LIMIT_MINUTES * 60_000
+    async with redis.pipeline(transaction=True) as pipe:
+        pipe.zremrangebyscore(key, 0, now_ms - window_ms)
+        pipe.zcard(key)
+        _, count = await pipe.execute()
+    if count:
         raise OrderLimitExceededError(settings.ORDER_RATE_LIMIT_MINUTES)
 
 
+async def _record_operation(user_id: int, op_type: OperationType) -> None:
+    """Фиксирует успешную операцию в окне rate limit."""
+    key = _rate_limit_key(user_id, op_type)
+    now_ms = int(time.time() * 1000)
+    window_ms = settings.ORDER_RATE_LIMIT_MINUTES * 60_000
+    async with redis.pipeline(transaction=True) as pipe:
+        pipe.zadd(key, {str(now_ms): now_ms})
+        pipe.pexpire(key, window_ms)
+        await pipe.execute()
+
+
+async def _restore_stock(db: AsyncSession, items: list[OrderItem]) -> None:
+    """
+    Возвращает остатки по позициям заказа относительным
+    UPDATE ... SET stock = stock + :qty (executemany, один round trip).
+    Абсолютная запись поверх прочитанного значения могла стереть
+    конкурентное атомарное списание; относительная — нет. Порядок по id
+    канонический, как и в резервировании.
+    """
+    if not items:
+        return
+    qty_by_product: dict[int, int] = {}
+    for it in items:
+        qty_by_product[it.product_id] = qty_by_product.get(it.product_id, 0) + it.quantity
+    await db.execute(
+        _STOCK_RESTORE.execution_options(synchronize_session=False),
+        [{"pid": pid, "qty": qty} for pid, qty in sorted(qty_by_product.items())],
+    )
+
+
 async def _validate_and_reserve_items(
     db: AsyncSession,
     items: list[dict],
-) -> tuple[list[tuple[Product, int]], Decimal]:
+) -> tuple[list[tuple[int, int, Decimal]], int]:
     """
     Для каждой позиции:
     1. Проверяет, что товар существует и ACTIVE
-    2. Проверяет достаточность остатков
-    3. Резервирует stock (уменьшает)
-    Возвращает список (product, quantity) и total_amount (без скидки).
+    2. Резервирует stock атомарным UPDATE ... WHERE stock >= qty
+    Возвращает список (product_id, quantity, price) и сумму в центах (без скидки).
     """
-    product_ids = [item["product_id"] for item in items]
-    result = await db.execute(
-        select(Product).where(Product.id.in_(product_ids))
-    )
-    products_by_id: dict[int, Product] = {p.id: p for p in result.scalars().all()}
-
     # Агрегируем количество по product_id (на случай дублей в items)
     qty_by_product: dict[int, int] = {}
     for item in items:
         pid = item["product_id"]
         qty_by_product[pid] = qty_by_product.get(pid, 0) + item["quantity"]
 
+    # Выбираем только нужные колонки: stock меняет атомарный UPDATE ниже,
+    # полные ORM-сущности Product здесь не нужны — гидрация строк дешевле
+    result = await db.execute(
+        select(Product.id, Product.price, Product.status, Product.stock)
+        .where(Product.id.in_(qty_by_product))
+    )
+    products_by_id = {row.id: row for row in result.all()}
+
     # Проверяем существование и статус
     for pid in qty_by_product:
         if pid not in products_by_id:
@@ -87,127 +172,168 @@ async def _validate_and_reserve_items(
         if products_by_id[pid].status != ProductStatus.ACTIVE:
             raise ProductInactiveError(pid)
 
-    # Проверяем остатки (собираем все недостающие сразу)
+    # Резервируем остатки: проверка и списание в одном атомарном UPDATE —
+    # никакой read-modify-write гонки между конкурентными заказами.
+    # При нехватке собираем все недостающие позиции; незакоммиченные
+    # списания откатятся вместе с транзакцией.
+    # Обходим товары по возрастанию id: каждый UPDATE держит row lock до
+    # коммита, и канонический порядок захвата исключает deadlock двух
+    # заказов с пересекающимися товарами в разном порядке
     insufficient = []
-    for pid, qty in qty_by_product.items():
-        p = products_by_id[pid]
-        if p.stock < qty:
+    for pid, qty in sorted(qty_by_product.items()):
+        reserved = await db.execute(
+            update(Product)
+            .where(Product.id == pid, Product.stock >= qty)
+            .values(stock=Product.stock - qty)
+            .execution_options(synchronize_session=False)
+        )
+        if reserved.rowcount == 0:
             insufficient.append({
                 "product_id": pid,
                 "requested": qty,
-                "available": p.stock,
+                "available": products_by_id[pid].stock,
             })
     if insufficient:
         raise InsufficientStockError(insufficient)
 
-    # Резервируем остатки
-    result_pairs = []
-    total = Decimal("0")
+    result_items = []
+    total_cents = 0
     for item in items:
         pid = item["product_id"]
         qty = item["quantity"]
-        p = products_by_id[pid]
-        p.stock -= qty
-        total += Decimal(str(p.price)) * qty
-        result_pairs.append((p, qty))
+        price = products_by_id[pid].price
+        total_cents += to_cents(price) * qty
+        result_items.append((pid, qty, price))
 
-    return result_pairs, total
+    return result_items, total_cents
 
 
-async def _apply_promo_code(
-    db: AsyncSession, code: str, total: Decimal
-) -> tuple[Optional[PromoCode], Decimal]:
+def _promo_still_applies(promo: PromoCode, total_cents: int) -> bool:
     """
-    Проверяет и применяет промокод. Возвращает (promo, discount_amount).
-    Для PERCENTAGE: скидка не более 70% от суммы.
-    Инкрементирует current_uses.
+    Применим ли уже занятый заказом промокод к новой сумме.
+    Исчерпание (current_uses >= max_uses) здесь не проверяется:
+    заказ уже держит своё использование, новое не занимается.
     """
-    result = await db.execute(select(PromoCode).where(PromoCode.code == code))
-    promo = result.scalar_one_or_none()
-
     now = datetime.now(timezone.utc)
+    return (
+        promo.active
+        and promo.valid_from <= now <= promo.valid_until
+        and total_cents >= to_cents(promo.min_order_amount)
+    )
+
 
-    if promo is None or not promo.active:
-        raise PromoCodeInvalidError("Промокод не найден или неактивен")
-    if promo.current_uses >= promo.max_uses:
-        raise PromoCodeInvalidError("Промокод исчерпан")
-    if now < promo.valid_from or now > promo.valid_until:
-        raise PromoCodeInvalidError("Промокод вышел за пределы срока действия")
+def _compute_discount_cents(discount_type, discount_value, total_cents: int) -> int:
+    """Скидка в центах; для PERCENTAGE — не более 70% от суммы."""
+    if discount_type == DiscountType.PERCENTAGE:
+        # Скидка и потолок 70% считаются в центах с округлением half-up
+        return min(
+            pct_of(total_cents, to_cents(discount_value)),
+            pct_of(total_cents, 70_00),
+        )
+    # FIXED_AMOUNT
+    return min(to_cents(discount_value), total_cents)
 
-    min_amount = Decimal(str(promo.min_order_amount))
-    if total < min_amount:
-        raise PromoCodeMinAmountError(float(min_amount), float(total))
 
-    discount_value = Decimal(str(promo.discount_value))
-    if promo.discount_type == DiscountType.PERCENTAGE:
-        discount = total * discount_value / 100
-        max_discount = total * Decimal("0.70")
-        discount = min(discount, max_discount)
-    else:  # FIXED_AMOUNT
-        discount = min(discount_value, total)
+async def _apply_promo_code(db, code: str, total_cents: int):
+    """
+    Проверяет и применяет промокод одним атомарным UPDATE ... RETURNING.
+    Возвращает (строка промокода, скидка в центах).
+    Для PERCENTAGE: скидка не более 70% от суммы.
+    """
+    # Заведомо маленькую корзину отклоняем по кэшированному порогу —
+    # без claim/release round trip'ов; окончательная проверка всё равно ниже
+    cached_min = promo_cache.get_min_amount_cents(code)
+    if cached_min is not None and total_cents < cached_min:
+        raise PromoCodeMinAmountError(cached_min / 100, total_cents / 100)
 
-    discount = discount.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+    now = datetime.now(timezone.utc)
+    result = await db.execute(
+        _PROMO_CLAIM.execution_options(synchronize_session=False),
+        {"code": code, "now": now},
+    )
+    promo = result.one_or_none()
+
+    if promo is None:
+        raise PromoCodeInvalidError("Промокод недействителен или исчерпан")
+
+    min_amount_cents = to_cents(promo.min_order_amount)
+    promo_cache.store_min_amount_cents(code, min_amount_cents)
+    if total_cents < min_amount_cents:
+        # Условие зависит от суммы заказа и в WHERE не помещается —
+        # компенсируем уже сделанный инкремент
+        await db.execute(
+            _PROMO_RELEASE.execution_options(synchronize_session=False),
+            {"pid": promo.id},
+        )
+        raise PromoCodeMinAmountError(min_amount_cents / 100, total_cents / 100)
 
-    promo.current_uses += 1
-    return promo, discount
+    return promo, _compute_discount_cents(promo.discount_type, promo.discount_value, total_cents)
 
 
 async def create_order(db: AsyncSession, user: User, items: list[dict], promo_code: Optional[str]) -> Order:
     if user.role == UserRole.SELLER:
         raise AccessDeniedError("SELLER не может создавать заказы")
 
-    # 1. Rate limit
-    await _check_rate_limit(db, user.id, OperationType.CREATE_ORDER)
-
-    # 2. Активный заказ
-    active = await repository.get_active_order_for_user(db, user.id)
+    # 1+2. Rate limit (Redis) и активный заказ (Postgres) независимы —
+    # перекрываем их латентности. Сессией БД пользуется только вторая
+    # корутина; advisory lock берётся до проверки активного заказа.
+    async def _lock_and_get_active():
+        # Сериализуем операции пользователя до проверки активного заказа
+        await db.execute(_USER_LOCK, {"k": user.id})
+        return await repository.get_active_order_for_user(db, user.id)
+
+    rate_limited, active = await asyncio.gather(
+        _check_rate_limit(user.id, OperationType.CREATE_ORDER),
+        _lock_and_get_active(),
+        return_exceptions=True,
+    )
+    # Порядок ошибок прежний: сначала rate limit, затем активный заказ
+    if isinstance(rate_limited, BaseException):
+        raise rate_limited
+    if isinstance(active, BaseException):
+        raise active
     if active:
         raise OrderHasActiveError()
 
     # 3+4+5. Проверка товаров и резервирование остатков
-    product_pairs, total = await _validate_and_reserve_items(db, items)
+    product_items, total_cents = await _validate_and_reserve_items(db, items)
 
     # 6+7. Промокод
     promo = None
-    discount = Decimal("0")
+    discount_cents = 0
     if promo_code:
-        promo, discount = await _apply_promo_code(db, promo_code, total)
-
-    final_total = total - discount
+        promo, discount_cents = await _apply_promo_code(db, promo_code, total_cents)
 
-    # 8. Создаём заказ
+    # 8. Создаём заказ сразу с позициями (снапшот цен): каскад выставит
+    # order_id при flush, коллекция items уже заполнена — перечитывать
+    # заказ после коммита не нужно. На flush это ровно два statement'а:
+    # INSERT orders ... RETURNING и один multi-VALUES INSERT всех позиций
+    # (insertmanyvalues), а не 1 + N
     order = Order(
         user_id=user.id,
         status=OrderStatus.CREATED,
         promo_code_id=promo.id if promo else None,
-        total_amount=final_total,
-        discount_amount=discount,
+        promo_code_snapshot=promo_code if promo else None,
+        total_amount=from_cents(total_cents - discount_cents),
+        discount_amount=from_cents(discount_cents),
+        items=[
+            OrderItem(product_id=pid, quantity=qty, price_at_order=price)
+            for pid, qty, price in product_items
+        ],
     )
     db.add(order)
-    await db.flush()  # получаем order.id
-
-    # Создаём позиции с снапшотом цен
-    for product, qty in product_pairs:
-        item = OrderItem(
-            order_id=order.id,
-            product_id=product.id,
-            quantity=qty,
-            price_at_order=product.price,
-        )
-        db.add(item)
 
-    # 9. Фиксируем операцию
-    op = UserOperation(user_id=user.id, operation_type=OperationType.CREATE_ORDER)
-    db.add(op)
+    # 9. Фиксируем операцию (строка в user_operations остаётся для аудита).
+    # Core INSERT: объект после записи не нужен, RETURNING и учёт
+    # в unit of work — лишние
+    await db.execute(
+        insert(UserOperation),
+        {"user_id": user.id, "operation_type": OperationType.CREATE_ORDER},
+    )
 
     await db.commit()
-    await db.refresh(order)
-
-    # Загружаем items для ответа
-    result = await db.execute(
-        select(Order).where(Order.id == order.id).options(selectinload(Order.items))
-    )
-    return result.scalar_one()
+    await _record_operation(user.id, OperationType.CREATE_ORDER)
+    return order
 
 
 async def get_order(db: AsyncSession, order_id: int, user: User) -> Order:
@@ -222,7 +348,24 @@ async def update_order(db: AsyncSession, order_id: int, user: User, new_items: l
     if user.role == UserRole.SELLER:
         raise AccessDeniedError("SELLER не может изменять заказы")
 
-    order = await repository.get_by_id(db, order_id)
+    # Загрузка заказа (Postgres) и rate limit (Redis) независимы —
+    # перекрываем их латентности; сессией БД пользуется только загрузка.
+    # Advisory lock берётся ДО чтения заказа: конкурентный запрос того же
+    # пользователя заблокируется на локе и увидит уже обновлённые
+    # status/items, а не провалидированный до блокировки снимок
+    async def _lock_and_get_order():
+        # Сериализуем операции пользователя на время правки заказа
+        await db.execute(_USER_LOCK, {"k": user.id})
+        return await repository.get_by_id(db, order_id)
+
+    order, rate_limited = await asyncio.gather(
+        _lock_and_get_order(),
+        _check_rate_limit(user.id, OperationType.UPDATE_ORDER),
+        return_exceptions=True,
+    )
+    # Порядок ошибок прежний: сначала проверки заказа, затем rate limit
+    if isinstance(order, BaseException):
+        raise order
     if order is None:
         raise OrderNotFoundError()
 
@@ -232,71 +375,106 @@ async def update_order(db: AsyncSession, order_id: int, user: User, new_items: l
     if order.status != OrderStatus.CREATED:
         raise InvalidStateTransitionError(order.status.value, "update")
 
-    # Rate limit на обновление
-    await _check_rate_limit(db, user.id, OperationType.UPDATE_ORDER)
+    if isinstance(rate_limited, BaseException):
+        raise rate_limited
 
     # Возвращаем предыдущие остатки
-    for old_item in order.items:
-        result = await db.execute(select(Product).where(Product.id == old_item.product_id))
-        product = result.scalar_one()
-        product.stock += old_item.quantity
+    await _restore_stock(db, list(order.items))
 
-    # Удаляем старые позиции
-    for old_item in list(order.items):
-        await db.delete(old_item)
-    await db.flush()
+    # Удаляем старые позиции одним DELETE вместо statement на строку
+    await db.execute(
+        delete(OrderItem)
+        .where(OrderItem.order_id == order.id)
+        .execution_options(synchronize_session=False)
+    )
 
     # Резервируем новые остатки
-    product_pairs, total = await _validate_and_reserve_items(db, new_items)
+    product_items, total_cents = await _validate_and_reserve_items(db, new_items)
 
-    # Пересчитываем промокод
+    # Пересчитываем промокод in-process: заказ уже держит использование,
+    # поэтому claim/release через БД не нужны — перечитываем поля промокода
+    # одним SELECT, проверяем применимость к новой сумме и либо оставляем
+    # счётчик как есть, либо освобождаем использование одним UPDATE
     promo = None
-    discount = Decimal("0")
+    discount_cents = 0
     if order.promo_code_id:
-        result = await db.execute(select(PromoCode).where(PromoCode.id == order.promo_code_id))
-        existing_promo = result.scalar_one_or_none()
-        if existing_promo:
-            try:
-                existing_promo.current_uses -= 1  # временно сбрасываем
-                promo, discount = await _apply_promo_code(db, existing_promo.code, total)
-            except Exception:
-                # Промокод больше не применим — снимаем скидку
-                existing_promo.current_uses += 1  # откатываем декремент
-                order.promo_code_id = None
-
-    final_total = total - discount
+        # Быстрый отказ по снапшоту кода и кэшированному порогу минимальной
+        # суммы — без SELECT промокода, когда новая корзина заведомо мала
+        cached_min = (
+            promo_cache.get_min_amount_cents(order.promo_code_snapshot)
+            if order.promo_code_snapshot
+            else None
+        )
+        if cached_min is not None and total_cents < cached_min:
+            await db.execute(
+                _PROMO_RELEASE.execution_options(synchronize_session=False),
+                {"pid": order.promo_code_id},
+            )
+            order.promo_code_id = None
+            order.promo_code_snapshot = None
+            existing_promo = None
+        else:
+            result = await db.execute(_PROMO_BY_ID, {"pid": order.promo_code_id})
+            existing_promo = result.scalar_one_or_none()
+        if existing_promo and _promo_still_applies(existing_promo, total_cents):
+            promo = existing_promo
+            discount_cents = _compute_discount_cents(
+                existing_promo.discount_type, existing_promo.discount_value, total_cents
+            )
+        else:
+            # Промокод больше не применим — снимаем скидку и возвращаем
+            # использование (заказ его больше не занимает)
+            if existing_promo:
+                await db.execute(
+                    _PROMO_RELEASE.execution_options(synchronize_session=False),
+                    {"pid": existing_promo.id},
+                )
+            order.promo_code_id = None
+            order.promo_code_snapshot = None
 
     # Обновляем заказ
-    order.total_amount = final_total
-    order.discount_amount = discount
+    order.total_amount = from_cents(total_cents - discount_cents)
+    order.discount_amount = from_cents(discount_cents)
     order.promo_code_id = promo.id if promo else None
 
-    # Создаём новые позиции
-    for product, qty in product_pairs:
-        item = OrderItem(
-            order_id=order.id,
-            product_id=product.id,
-            quantity=qty,
-            price_at_order=product.price,
-        )
-        db.add(item)
+    # Создаём новые позиции одним multi-VALUES INSERT (insertmanyvalues)
+    await db.execute(
+        insert(OrderItem),
+        [
+            {
+                "order_id": order.id,
+                "product_id": pid,
+                "quantity": qty,
+                "price_at_order": price,
+            }
+            for pid, qty, price in product_items
+        ],
+    )
 
-    # Фиксируем операцию
-    op = UserOperation(user_id=user.id, operation_type=OperationType.UPDATE_ORDER)
-    db.add(op)
+    # Фиксируем операцию (строка в user_operations остаётся для аудита)
+    await db.execute(
+        insert(UserOperation),
+        {"user_id": user.id, "operation_type": OperationType.UPDATE_ORDER},
+    )
 
     await db.commit()
+    await _record_operation(user.id, OperationType.UPDATE_ORDER)
 
-    result = await db.execute(
-        select(Order).where(Order.id == order.id).options(selectinload(Order.items))
-    )
-    return result.scalar_one()
+    # Перечитываем только коллекцию items (один SELECT по order_id) вместо
+    # повторной загрузки всего заказа с selectinload
+    await db.refresh(order, ["items"])
+    return order
 
 
 async def cancel_order(db: AsyncSession, order_id: int, user: User) -> Order:
     if user.role == UserRole.SELLER:
         raise AccessDeniedError("SELLER не может отменять заказы")
 
+    # Сериализуем операции пользователя до чтения заказа: двойная отмена
+    # иначе дважды проходит can_transition по снимку до блокировки и дважды
+    # возвращает остатки и использование промокода
+    await db.execute(_USER_LOCK, {"k": user.id})
+
     order = await repository.get_by_id(db, order_id)
     if order is None:
         raise OrderNotFoundError()
@@ -304,27 +482,23 @@ async def cancel_order(db: AsyncSession, order_id: int, user: User) -> Order:
     _check_order_access(order, user)
 
     # Отмена разрешена только из CREATED / PAYMENT_PENDING
-    cancellable = {OrderStatus.CREATED, OrderStatus.PAYMENT_PENDING}
-    if order.status not in cancellable:
+    if not can_transition(order.status.value, OrderStatus.CANCELED.value):
         raise InvalidStateTransitionError(order.status.value, "CANCELED")
 
     # Возвращаем остатки на склад
-    for item in order.items:
-        result = await db.execute(select(Product).where(Product.id == item.product_id))
-        product = result.scalar_one()
-        product.stock += item.quantity
+    await _restore_stock(db, list(order.items))
 
-    # Возвращаем использование промокода
+    # Возвращаем использование промокода условным UPDATE — без SELECT
+    # и read-modify-write гонки
     if order.promo_code_id:
-        result = await db.execute(select(PromoCode).where(PromoCode.id == order.promo_code_id))
-        promo = result.scalar_one_or_none()
-        if promo and promo.current_uses > 0:
-            promo.current_uses -= 1
+        await db.execute(
+            _PROMO_RELEASE.execution_options(synchronize_session=False),
+            {"pid": order.promo_code_id},
+        )
 
     order.status = OrderStatus.CANCELED
     await db.commit()
 
-    result = await db.execute(
-        select(Order).where(Order.id == order.id).options(selectinload(Order.items))
-    )
-    return result.scalar_one()
+    # items уже загружены selectinload'ом в get_by_id, а expire_on_commit=False
+    # сохраняет их после коммита — перечитывать заказ не нужно
+    return order
@@ -1,14 +1,18 @@
 from decimal import Decimal
 from typing import Optional
 
-from sqlalchemy import select, func, update
+from sqlalchemy import bindparam, select, func, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.orm import Product, ProductStatus
 
+# Statement собирается один раз при импорте: на каждый запрос остаётся
+# только подстановка параметров, без повторной сборки Core-дерева
+_PRODUCT_BY_ID = select(Product).where(Product.id == bindparam("pid"))
+
 
 async def get_by_id(db: AsyncSession, product_id: int) -> Optional[Product]:
-    result = await db.execute(select(Product).where(Product.id == product_id))
+    result = await db.execute(_PRODUCT_BY_ID, {"pid": product_id})
     return result.scalar_one_or_none()
 
 
@@ -18,20 +22,43 @@ async def list_products(
     size: int,
     status: Optional[ProductStatus] = None,
     category: Optional[str] = None,
-) -> tuple[list[Product], int]:
-    query = select(Product)
-    count_query = select(func.count()).select_from(Product)
+    after_id: Optional[int] = None,
+) -> tuple[list[Product], Optional[int]]:
+    # Keyset-пагинация: WHERE id > :after_id — range scan по PK независимо
+    # от глубины страницы, в отличие от OFFSET, который читает и выбрасывает
+    # page*size строк. Общее число строк в этом режиме не считается.
+    if after_id is not None:
+        query = select(Product).where(Product.id > after_id)
+        if status is not None:
+            query = query.where(Product.status == status)
+        if category is not None:
+            query = query.where(Product.category == category)
+        result = await db.execute(query.order_by(Product.id).limit(size))
+        return list(result.scalars().all()), None
+
+    # count(*) OVER () отдаёт общее число строк тем же запросом,
+    # что и страница — один round trip вместо двух
+    query = select(Product, func.count().over().label("total"))
 
     if status is not None:
         query = query.where(Product.status == status)
-        count_query = count_query.where(Product.status == status)
     if category is not None:
         query = query.where(Product.category == category)
-        count_query = count_query.where(Product.category == category)
 
+    # Стабильный порядок нужен и OFFSET-страницам — иначе строки могут
+    # повторяться или пропадать между страницами
+    rows = (await db.execute(query.order_by(Product.id).offset(page * size).limit(size))).all()
+    if rows:
+        return [row[0] for row in rows], rows[0].total
+
+    # Страница за пределами выборки: общее число приходится считать отдельно
+    count_query = select(func.count()).select_from(Product)
+    if status is not None:
+        count_query = count_query.where(Product.status == status)
+    if category is not None:
+        count_query = count_query.where(Product.category == category)
     total = (await db.execute(count_query)).scalar_one()
-    products = (await db.execute(query.offset(page * size).limit(size))).scalars().all()
-    return list(products), total
+    return [], total
 
 
 async def create_product(
@@ -54,8 +81,9 @@ async def create_product(
         seller_id=seller_id,
     )
     db.add(product)
+    # expire_on_commit=False + eager_defaults: объект остаётся пригодным
+    # после коммита, refresh не нужен
     await db.commit()
-    await db.refresh(product)
     return product
 
 
@@ -64,5 +92,4 @@ async def update_product(db: AsyncSession, product: Product, **fields) -> Produc
         if value is not None:
             setattr(product, key, value)
     await db.commit()
-    await db.refresh(product)
     return product
@@ -16,7 +16,10 @@ router = APIRouter(prefix="/products", tags=["products"])
 
 
 def _to_response(p) -> ProductResponse:
-    return ProductResponse(
+    # model_construct пропускает цепочку валидаторов Pydantic: данные пришли
+    # из БД и уже соответствуют схеме, повторная проверка на каждой строке
+    # списка — чистые накладные расходы
+    return ProductResponse.model_construct(
         id=p.id,
         name=p.name,
         description=p.description,
@@ -36,11 +39,15 @@ async def list_products(
     size: int = Query(20, ge=1, le=100),
     status: Optional[ProductStatus] = Query(None),
     category: Optional[str] = Query(None),
+    after_id: Optional[int] = Query(None, ge=1),
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    products, total = await service.list_products(db, page, size, status, category)
-    return ProductListResponse(
+    # При заданном after_id работает keyset-пагинация: totalElements
+    # не считается (total is None), курсор следующей страницы — id
+    # последнего элемента
+    products, total = await service.list_products(db, page, size, status, category, after_id)
+    return ProductListResponse.model_construct(
         items=[_to_response(p) for p in products],
         totalElements=total,
         page=page,
@@ -3,7 +3,7 @@ from typing import Optional
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.exceptions import ProductNotFoundError, AccessDeniedError
-from app.models.orm import Product, ProductStatus, UserRole, User
+from app.models.orm import Product, ProductStatus, UserRole, User, coerce_product_status
 from app.products import repository
 
 
@@ -26,8 +26,9 @@ async def list_products(
     size: int,
     status: Optional[ProductStatus] = None,
     category: Optional[str] = None,
+    after_id: Optional[int] = None,
 ):
-    return await repository.list_products(db, page, size, status, category)
+    return await repository.list_products(db, page, size, status, category, after_id)
 
 
 async def create_product(db: AsyncSession, data: dict, user: User) -> Product:
@@ -36,8 +37,7 @@ async def create_product(db: AsyncSession, data: dict, user: User) -> Product:
 
     seller_id = user.id if user.role == UserRole.SELLER else data.get("seller_id")
     # Конвертируем Pydantic-enum в ORM-enum (data["status"] может быть Pydantic-enum из generated models)
-    raw_status = data["status"]
-    orm_status = ProductStatus(raw_status.value if hasattr(raw_status, "value") else raw_status)
+    orm_status = coerce_product_status(data["status"])
     return await repository.create_product(
         db,
         name=data["name"],
@@ -59,8 +59,7 @@ async def update_product(db: AsyncSession, product_id: int, data: dict, user: Us
 
     # Конвертируем status если передан
     if "status" in data and data["status"] is not None:
-        raw = data["status"]
-        data["status"] = ProductStatus(raw.value if hasattr(raw, "value") else raw)
+        data["status"] = coerce_product_status(data["status"])
 
     return await repository.update_product(db, product, **{k: v for k, v in data.items() if v is not None})
 
@@ -0,0 +1,27 @@
+"""
+Внутрипроцессный TTL-кэш метаданных промокодов.
+
+Промокоды — маленький и редко меняющийся набор, а min_order_amount нужен
+на каждом заказе с промокодом ещё до атомарного UPDATE: заведомо слишком
+маленькую корзину можно отклонить по кэшу без round trip'ов claim/release
+в Postgres. Сам счётчик current_uses никогда не кэшируется — его проверяет
+и инкрементирует только атомарный UPDATE.
+"""
+from cachetools import TTLCache
+
+# 30 секунд — максимальное устаревание порога min_order_amount;
+# ошибка в обе стороны безопасна: финальную проверку делает БД-путь
+_promo_meta = TTLCache(maxsize=1024, ttl=30)
+
+
+def get_min_amount_cents(code: str):
+    """Порог min_order_amount в центах из кэша, либо None."""
+    return _promo_meta.get(code)
+
+
+def store_min_amount_cents(code: str, min_amount_cents: int) -> None:
+    _promo_meta[code] = min_amount_cents
+
+
+def invalidate(code: str) -> None:
+    _promo_meta.pop(code, None)
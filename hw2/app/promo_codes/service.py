@@ -4,7 +4,8 @@ from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.exceptions import AccessDeniedError, PromoCodeConflictError
-from app.models.orm import PromoCode, UserRole, User
+from app.models.orm import PromoCode, UserRole, User, coerce_discount_type
+from app.promo_codes import cache as promo_cache
 
 
 async def create_promo_code(db: AsyncSession, data: dict, user: User) -> PromoCode:
@@ -16,9 +17,7 @@ async def create_promo_code(db: AsyncSession, data: dict, user: User) -> PromoCo
     if existing.scalar_one_or_none():
         raise PromoCodeConflictError()
 
-    from app.models.orm import DiscountType
-    raw_dt = data["discount_type"]
-    orm_discount_type = DiscountType(raw_dt.value if hasattr(raw_dt, "value") else raw_dt)
+    orm_discount_type = coerce_discount_type(data["discount_type"])
 
     promo = PromoCode(
         code=data["code"],
@@ -33,5 +32,6 @@ async def create_promo_code(db: AsyncSession, data: dict, user: User) -> PromoCo
     )
     db.add(promo)
     await db.commit()
-    await db.refresh(promo)
+    # Сбрасываем возможную запись в кэше метаданных по этому коду
+    promo_cache.invalidate(promo.code)
     return promo
@@ -0,0 +1,6 @@
+from redis import asyncio as aioredis
+
+from app.config import settings
+
+# Один клиент на процесс: redis-py сам держит пул соединений
+redis = aioredis.from_url(settings.REDIS_URL)
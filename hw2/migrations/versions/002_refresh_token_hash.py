@@ -0,0 +1,42 @@
+"""Store refresh tokens as sha256 hashes
+
+Revision ID: 002
+Revises: 001
+Create Date: 2024-01-01 00:00:00.000000
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "002"
+down_revision: Union[str, None] = "001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Старые токены в новом формате бесполезны — инвалидируем
+    op.execute("DELETE FROM refresh_tokens")
+
+    op.drop_column("refresh_tokens", "token")
+    op.add_column(
+        "refresh_tokens",
+        sa.Column("token_hash", sa.LargeBinary(32), nullable=False),
+    )
+    # 32-байтовый btree-индекс вместо 512-символьной строки
+    op.create_index(
+        "ix_refresh_tokens_token_hash", "refresh_tokens", ["token_hash"], unique=True
+    )
+
+
+def downgrade() -> None:
+    op.execute("DELETE FROM refresh_tokens")
+
+    op.drop_index("ix_refresh_tokens_token_hash", table_name="refresh_tokens")
+    op.drop_column("refresh_tokens", "token_hash")
+    op.add_column(
+        "refresh_tokens",
+        sa.Column("token", sa.String(512), nullable=False),
+    )
+    op.create_unique_constraint(None, "refresh_tokens", ["token"])
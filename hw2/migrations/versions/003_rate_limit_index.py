@@ -0,0 +1,29 @@
+"""Composite index for the rate-limit window probe
+
+Revision ID: 003
+Revises: 002
+Create Date: 2024-01-01 00:00:00.000000
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "003"
+down_revision: Union[str, None] = "002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Покрывает WHERE user_id = ? AND operation_type = ? AND created_at > ?
+    # из rate-limit проверки: один index probe вместо скана по user_id
+    op.create_index(
+        "ix_user_ops_ratelimit",
+        "user_operations",
+        ["user_id", "operation_type", sa.text("created_at DESC")],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_user_ops_ratelimit", table_name="user_operations")
@@ -0,0 +1,40 @@
+"""Partial and covering indexes for the order hot path
+
+Revision ID: 004
+Revises: 003
+Create Date: 2024-01-01 00:00:00.000000
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "004"
+down_revision: Union[str, None] = "003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # get_active_order_for_user фильтрует по user_id + status IN (CREATED,
+    # PAYMENT_PENDING); частичный индекс покрывает ровно этот предикат и
+    # остаётся крошечным — завершённые заказы в него не попадают
+    op.create_index(
+        "ix_orders_user_active",
+        "orders",
+        ["user_id"],
+        postgresql_where=sa.text("status IN ('CREATED', 'PAYMENT_PENDING')"),
+    )
+    # selectinload(Order.items) читает все колонки позиций по order_id;
+    # INCLUDE кладёт их в лист индекса — index-only scan без обращения к heap
+    op.create_index(
+        "ix_order_items_order",
+        "order_items",
+        ["order_id"],
+        postgresql_include=["product_id", "quantity", "price_at_order"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_order_items_order", table_name="order_items")
+    op.drop_index("ix_orders_user_active", table_name="orders")
@@ -0,0 +1,28 @@
+"""Denormalized promo code snapshot on orders
+
+Revision ID: 005
+Revises: 004
+Create Date: 2024-01-01 00:00:00.000000
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "005"
+down_revision: Union[str, None] = "004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Код промокода фиксируется на заказе в момент применения — по аналогии
+    # со снапшотом цены price_at_order; существующие заказы остаются с NULL
+    op.add_column(
+        "orders",
+        sa.Column("promo_code_snapshot", sa.String(20), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("orders", "promo_code_snapshot")